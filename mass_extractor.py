@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
+import io
 import os
+import queue
+import threading
 import zipfile
 import rarfile
 import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 
 import faulthandler
@@ -10,23 +14,333 @@ import faulthandler
 
 faulthandler.enable()
 
+# Environment override for the number of concurrent extraction processes.
+# Lower it when the disk, not the CPU, is the bottleneck.
+WORKERS_ENV = 'MASS_EXTRACTOR_WORKERS'
 
-def extract_archive(archive_path, extract_path):
+
+def get_worker_count():
+    """
+    Return the number of worker processes to use for extraction.
+
+    Defaults to the CPU count, overridable via the MASS_EXTRACTOR_WORKERS
+    environment variable.
+
+    Returns:
+        int: Number of worker processes (at least 1)
+    """
+    override = os.environ.get(WORKERS_ENV)
+    if override:
+        try:
+            return max(1, int(override))
+        except ValueError:
+            print(f"Ignoring invalid {WORKERS_ENV}={override!r}")
+    return os.cpu_count() or 1
+
+
+# Archive types handled by extract_archive
+ARCHIVE_SUFFIXES = ('.zip', '.rar')
+
+# Copy buffer used when writing archive members to disk
+COPY_BUFSIZE = 1 << 20
+
+# Number of COPY_BUFSIZE chunks read ahead of the zip decoder
+PREFETCH_DEPTH = 4
+
+# Number of COPY_BUFSIZE chunks that may wait for the writer thread.
+# This bounds the memory held per worker process.
+WRITE_BEHIND_DEPTH = 64
+
+def _member_target(extract_path, member_name):
+    """
+    Build the destination path for an archive member, dropping absolute
+    prefixes and '..' components the same way zipfile.extractall does.
+
+    Args:
+        extract_path (Path): Path where files should be extracted
+        member_name (str): Name of the member inside the archive
+
+    Returns:
+        Path: Destination path, or None if nothing is left of the name
+    """
+    parts = [part for part in member_name.replace('\\', '/').split('/')
+             if part not in ('', '.', '..')]
+    if not parts:
+        return None
+    # Strip drive letters such as 'C:' from the first component
+    parts[0] = os.path.splitdrive(parts[0])[1] or parts[0]
+    return extract_path.joinpath(*parts)
+
+
+class _PrefetchingStream(io.RawIOBase):
+    """
+    Read-only, seekable view of a file that is read ahead on a background
+    thread, so disk reads overlap with decompression.
+
+    A producer thread reads COPY_BUFSIZE chunks from the current position
+    into a bounded queue. Seeking inside the current chunk is free; any
+    other seek restarts the producer at the new position. zipfile re-seeks
+    to the current position before every read, and members are mostly laid
+    out back to back, so extraction stays on the sequential fast path.
+    """
+
+    def __init__(self, path, depth=PREFETCH_DEPTH):
+        super().__init__()
+        self.name = str(path)
+        self._file = open(path, 'rb', buffering=0)
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._depth = depth
+        self._pos = 0
+        self._chunk = b''
+        self._chunk_pos = 0
+        self._eof = False
+        self._queue = None
+        self._stop = None
+        self._thread = None
+
+    def _produce(self, start, chunks, stop):
+        try:
+            self._file.seek(start)
+            while not stop.is_set():
+                data = self._file.read(COPY_BUFSIZE)
+                chunks.put(data)
+                if not data:
+                    return
+        except Exception as e:
+            # Hand the error to the reader instead of leaving it waiting
+            chunks.put(e)
+
+    def _start_producer(self):
+        self._queue = queue.Queue(maxsize=self._depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True,
+                                        args=(self._pos, self._queue, self._stop))
+        self._thread.start()
+
+    def _stop_producer(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        # Drain so a producer blocked on a full queue can see the stop flag
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        self._thread.join()
+        self._thread = None
+        self._chunk = b''
+        self._chunk_pos = 0
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        if offset != self._pos:
+            chunk_offset = offset - self._pos + self._chunk_pos
+            if self._thread is not None and 0 <= chunk_offset < len(self._chunk):
+                self._chunk_pos = chunk_offset
+            else:
+                self._stop_producer()
+            self._pos = offset
+        return self._pos
+
+    def _next_chunk(self):
+        """Make sure unread bytes are buffered; returns False at EOF."""
+        if self._chunk_pos < len(self._chunk):
+            return True
+        if self._eof:
+            return False
+        if self._thread is None:
+            self._start_producer()
+        chunk = self._queue.get()
+        if isinstance(chunk, Exception):
+            # The producer has stopped; a later read starts a new one
+            self._stop_producer()
+            raise chunk
+        self._chunk = chunk
+        self._chunk_pos = 0
+        self._eof = not self._chunk
+        return not self._eof
+
+    def readinto(self, b):
+        if not self._next_chunk():
+            return 0
+        n = min(len(b), len(self._chunk) - self._chunk_pos)
+        with memoryview(self._chunk) as view:
+            b[:n] = view[self._chunk_pos:self._chunk_pos + n]
+        self._chunk_pos += n
+        self._pos += n
+        return n
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(0, self._size - self._pos)
+        parts = []
+        while size > 0 and self._next_chunk():
+            start = self._chunk_pos
+            end = min(len(self._chunk), start + size)
+            # Whole chunks are handed out without copying
+            if start == 0 and end == len(self._chunk):
+                parts.append(self._chunk)
+            else:
+                parts.append(self._chunk[start:end])
+            self._chunk_pos = end
+            self._pos += end - start
+            size -= end - start
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    def close(self):
+        if not self.closed:
+            self._stop_producer()
+            self._file.close()
+        super().close()
+
+
+class _DirectWriter:
+    """
+    Synchronous counterpart of _WriteBehind: writes in the calling thread.
+    """
+
+    def write(self, dst, data):
+        dst.write(data)
+
+    def close_file(self, dst):
+        dst.close()
+
+    def finish(self):
+        pass
+
+
+class _WriteBehind:
+    """
+    Writes data to its files on a background thread, so the decoder never
+    waits on disk.
+    At most WRITE_BEHIND_DEPTH chunks are queued; the first error is
+    re-raised from write(), close_file() or finish().
+    """
+
+    def __init__(self, depth=WRITE_BEHIND_DEPTH):
+        self._queue = queue.Queue(maxsize=depth)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            dst, data = job
+            try:
+                if data is None:
+                    dst.close()
+                elif self._error is None:
+                    dst.write(data)
+            except Exception as e:
+                # Keep draining the queue, so write() and finish() never block
+                if self._error is None:
+                    self._error = e
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, dst, data):
+        self._check()
+        self._queue.put((dst, data))
+
+    def close_file(self, dst):
+        self._queue.put((dst, None))
+        self._check()
+
+    def finish(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._check()
+
+
+def _copy_member(src, dst, writer):
+    """
+    Copy an open archive member to an open file in COPY_BUFSIZE chunks.
+    Writing and closing dst is left to the writer.
+
+    Args:
+        src: Readable member file object
+        dst: Writable binary file object
+        writer (_DirectWriter or _WriteBehind): Writes and closes dst
+    """
+    try:
+        while True:
+            data = src.read(COPY_BUFSIZE)
+            if not data:
+                break
+            writer.write(dst, data)
+    finally:
+        writer.close_file(dst)
+
+
+def _extract_members(archive, extract_path, pipelined=False):
+    """
+    Extract every member of an open ZipFile, copying data through a large
+    buffer instead of the small default one used by extractall.
+
+    Args:
+        archive: Open zipfile.ZipFile
+        extract_path (Path): Path where files should be extracted
+        pipelined (bool): Write output on a background thread while the
+            next data is decoded
+    """
+    writer = _WriteBehind() if pipelined else _DirectWriter()
+    try:
+        for info in archive.infolist():
+            target = _member_target(extract_path, info.filename)
+            if target is None:
+                continue
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(target.parent, exist_ok=True)
+            with archive.open(info) as src:
+                _copy_member(src, open(target, 'wb', buffering=0), writer)
+    finally:
+        writer.finish()
+
+
+def extract_archive(archive_path, extract_path, pipelined=False):
     """
     Extract a single archive file (zip or rar) to the specified path.
 
     Args:
         archive_path (Path): Path to the archive file
         extract_path (Path): Path where files should be extracted
+        pipelined (bool): Overlap reading, decompression and writing using
+            helper threads. Pays off on slow disks with spare CPU cores.
 
     Returns:
         bool: True if extraction was successful, False otherwise
     """
     try:
         if archive_path.suffix.lower() == '.zip':
-            with zipfile.ZipFile(archive_path, 'r') as archive:
-                archive.extractall(extract_path)
+            source = _PrefetchingStream(archive_path) if pipelined else open(archive_path, 'rb')
+            with source, zipfile.ZipFile(source, 'r') as archive:
+                _extract_members(archive, extract_path, pipelined)
         elif archive_path.suffix.lower() == '.rar':
+            # extractall restores permissions and timestamps and creates
+            # symlinks safely, which a plain member copy would lose
             with rarfile.RarFile(archive_path, 'r') as archive:
                 archive.extractall(extract_path)
         return True
@@ -35,7 +349,26 @@ def extract_archive(archive_path, extract_path):
         return False
 
 
-def extract_archives(folder_path, target_folder, num_files=None):
+def _iter_archives(source_path):
+    """
+    Yield the zip and rar files in a folder, sorted by name for a consistent
+    processing order, from a single directory scan.
+
+    Args:
+        source_path (Path): Folder containing archive files
+
+    Yields:
+        Path: Archive file
+    """
+    with os.scandir(source_path) as entries:
+        archives = sorted((entry for entry in entries
+                           if entry.name.lower().endswith(ARCHIVE_SUFFIXES) and entry.is_file()),
+                          key=lambda entry: entry.name)
+    for entry in archives:
+        yield Path(entry.path)
+
+
+def extract_archives(folder_path, target_folder, num_files=None, pipelined=False):
     """
     Extract zip and rar files from source folder to target folder, creating subdirectories
     matching archive file names (without extension).
@@ -44,6 +377,8 @@ def extract_archives(folder_path, target_folder, num_files=None):
         folder_path (str): Path to folder containing archive files
         target_folder (str): Path where files should be extracted
         num_files (int, optional): Number of files to process. If None, process all files
+        pipelined (bool): Overlap reading, decompression and writing within
+            each archive (see extract_archive)
 
     Returns:
         tuple: (processed_count, skipped_count)
@@ -55,33 +390,48 @@ def extract_archives(folder_path, target_folder, num_files=None):
     # Create target folder if it doesn't exist
     target_path.mkdir(parents=True, exist_ok=True)
 
-    # Get list of archive files
-    archive_files = list(source_path.glob('*.zip')) + list(source_path.glob('*.rar'))
-    archive_files.sort()  # Sort to ensure consistent processing order
-
-    # # Limit number of files if specified
-    # if num_files is not None:
-    #     archive_files = archive_files[:num_files]
-
     processed_count = 0
     skipped_count = 0
 
-    for archive_file in archive_files:
-        # Create target subfolder name by removing extension
-        subfolder_name = archive_file.stem
-        extract_path = target_path / subfolder_name
+    # Keep at most max_workers archives in flight and stop pulling archives
+    # once the remaining quota is covered, so num_files is not overshot.
+    # Already extracted archives are filtered out before they reach the pool.
+    max_workers = get_worker_count()
+    archive_files = _iter_archives(source_path)
+    in_flight = {}
+    claimed = set()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            while len(in_flight) < max_workers and (
+                    num_files is None or processed_count + len(in_flight) < num_files):
+                archive_file = next(archive_files, None)
+                if archive_file is None:
+                    break
+
+                # Create target subfolder name by removing extension
+                extract_path = target_path / archive_file.stem
+
+                # Skip if target folder already exists, or another archive
+                # with the same stem (a.zip and a.rar) is already extracting into it
+                if extract_path.exists() or archive_file.stem in claimed:
+                    print(f"Skipping {archive_file.name} - target folder already exists")
+                    skipped_count += 1
+                    continue
+                claimed.add(archive_file.stem)
+
+                print(f"{processed_count + len(in_flight)}/{num_files}. "
+                      f"Extracting {archive_file.name} to {extract_path}")
+                future = executor.submit(extract_archive, archive_file, extract_path, pipelined)
+                in_flight[future] = archive_file
 
-        # Skip if target folder already exists
-        if extract_path.exists():
-            print(f"Skipping {archive_file.name} - target folder already exists")
-            skipped_count += 1
-            continue
+            if not in_flight:
+                break
 
-        print(f"{processed_count}/{num_files}. Extracting {archive_file.name} to {extract_path}")
-        if extract_archive(archive_file, extract_path):
-            processed_count += 1
-        if processed_count >= num_files:
-            break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                del in_flight[future]
+                if future.result():
+                    processed_count += 1
 
     return processed_count, skipped_count
 
@@ -91,10 +441,13 @@ def main():
     parser.add_argument('-f','--folder', help='Source folder containing zip/rar files')
     parser.add_argument('-t','--target', help='Target folder for extracted files')
     parser.add_argument('-n', '--num_files', type=int, help='Number of files to process')
+    parser.add_argument('-p', '--pipeline', action='store_true',
+                        help='Overlap reading, decompression and writing with helper threads '
+                             '(helps on slow disks when there are spare CPU cores)')
 
     args = parser.parse_args()
 
-    processed, skipped = extract_archives(args.folder, args.target, args.num_files)
+    processed, skipped = extract_archives(args.folder, args.target, args.num_files, args.pipeline)
     print(f"\nExtraction complete:")
     print(f"Files processed: {processed}")
     print(f"Files skipped: {skipped}")
@@ -1,12 +1,73 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import atexit
+import collections
+import contextlib
+import functools
+import lzma
 import os
 import re
 import shutil
 import subprocess
 import sys
+import uuid
+import zipfile
 from pathlib import Path
 
+try:
+    # Optional: extract in-process instead of launching unzip/unrar/7z
+    import libarchive
+except ImportError:
+    libarchive = None
+
+try:
+    # Optional: extract .7z / .7z.001 in-process instead of launching 7z
+    import multivolumefile
+    import py7zr
+    import py7zr.exceptions
+    # What reading a damaged 7z with py7zr can raise besides OSError
+    _PY7ZR_ERRORS = (py7zr.exceptions.ArchiveError, py7zr.exceptions.PasswordRequired,
+                     py7zr.exceptions.AbsolutePathError, lzma.LZMAError, EOFError)
+except ImportError:
+    py7zr = None
+    _PY7ZR_ERRORS = ()
+
+
+# Caps how many extractions (subprocesses or in-process) run at once, no matter
+# how many archives are waiting, so parallel extraction does not thrash the disk.
+# One slot per thread: 7z/unrar runs given a thread hint hold several.
+EXTRACT_SLOTS = asyncio.BoundedSemaphore(os.cpu_count() or 1)
+# Taken while grabbing several slots, so two such grabs cannot deadlock
+_MULTI_SLOT_LOCK = asyncio.Lock()
+# Threads 7z/unrar may use for a single archive; 1 passes no hint at all
+THREADS_PER_ARCHIVE = 1
+
+# Pattern for multi-part splits we do NOT want to copy:
+_SKIP_RE = re.compile('|'.join([
+    r'\.r\d+$',  # .r00, .r01, .r02, ...
+    r'\.\d{3}$',  # .001, .002, .003, ...
+    r'\.z\d{2}$',  # .z01, .z02, .z03, ...
+    r'\.7z\.\d{3}$'  # .7z.001, .7z.002, .7z.003, ...
+]), re.IGNORECASE)
+
+# Suffixes of "core" archives: .rar, .zip, .7z, plus the first part of a
+# multi-part 7z (some 7z multi-part splits start at .7z.001, .7z.002, etc.
+# and we treat .7z.001 as the "core")
+_CORE_SUFFIXES = ('.rar', '.zip', '.7z', '.7z.001')
+
+# libarchive reader format per archive suffix. Anything else (e.g. split
+# .7z.001 volumes) goes straight to the external tools.
+_LIBARCHIVE_FORMATS = {'.zip': 'zip', '.rar': 'rar', '.7z': '7zip'}
+
+# File classification flags, see _classify_suffix
+_CORE = 1
+_SPLIT = 2
+
+# Buffer size for writing extracted data, and for cross-filesystem copies
+# when copy_file_range is unavailable
+COPY_BUFSIZE = 1 << 20
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -35,6 +96,25 @@ def parse_args():
         default=0,
         help='Number of archives to process. 0 means no limit.'
     )
+    parser.add_argument(
+        '--ramdisk-size',
+        type=int,
+        default=0,
+        help='Mount a tmpfs of this many MiB on tmp_dir (Linux, needs root) '
+             'unless it already is one. 0 means do not mount.'
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Print every file moved or skipped, not just every archive.'
+    )
+    parser.add_argument(
+        '--threads-per-archive',
+        type=int,
+        default=1,
+        help='Let 7z and unrar use this many threads per archive (unrar 5.x+ '
+             'for -mt). Each such run counts as that many concurrent extractions.'
+    )
     return parser.parse_args()
 
 
@@ -48,121 +128,620 @@ def is_core_archive(file_path: Path) -> bool:
 
     Everything else like .r00, .r01, .z01, .7z.002, etc. is skipped.
     """
-    filename = file_path.name.lower()
+    return is_core_name(file_path.name)
 
-    # If it is just .rar, .zip, or .7z, treat as core archive
-    if filename.endswith('.rar') or filename.endswith('.zip') or filename.endswith('.7z'):
-        return True
 
-    # Special case for multi-part 7z (like data.7z.001 as the first part)
-    # Some 7z multi-part splits start at .7z.001, .7z.002, etc.
-    # We'll treat .7z.001 as the "core."
-    if re.search(r'\.7z\.001$', filename):
-        return True
+def is_core_name(filename: str) -> bool:
+    """
+    Same as is_core_archive, for a bare file name.
+    """
+    return bool(_classify_name(filename) & _CORE)
+
 
-    return False
+@functools.lru_cache(maxsize=1024)
+def _classify_suffix(suffix: str) -> int:
+    """
+    Classifies a file by the last two dotted tokens of its name
+    (e.g. 'rar', 'part1.RAR', '7z.001'): a mix of _CORE (archive to extract)
+    and _SPLIT (secondary part, never moved to the output). Both patterns
+    only ever look at those two tokens, so the answer depends on the suffix
+    alone and is cached. Case folding happens here, on cache misses only.
+    """
+    suffix = '.' + suffix.lower()
+    flags = 0
+    if suffix.endswith(_CORE_SUFFIXES):
+        flags |= _CORE
+    if _SKIP_RE.search(suffix):
+        flags |= _SPLIT
+    return flags
 
 
-def extract_archive(archive_path: Path, target_folder: Path):
+def _classify_name(filename: str) -> int:
     """
-    Extracts an archive to tmp_dir using external commands.
-    Adjust as needed for different archive types.
+    Returns the _CORE/_SPLIT flags of a bare file name.
+    The name is not lowercased here (no full-name copy per file);
+    _classify_suffix folds case once per distinct suffix.
     """
-    target_folder.mkdir(parents=True, exist_ok=True)
+    tokens = filename.rsplit('.', 2)
+    return _classify_suffix(tokens[-1] if len(tokens) == 2 else '.'.join(tokens[1:]))
 
+
+@functools.lru_cache(maxsize=None)
+def _tool(name: str) -> str:
+    """
+    Returns the full path of an external tool (or the bare name if it is not
+    on PATH, so launching it fails as before).
+    Together with close_fds=False this lets subprocess launch the tool with
+    posix_spawn instead of fork+exec, which is cheaper for a large parent
+    process. Our own descriptors are non-inheritable, so nothing leaks.
+    """
+    return shutil.which(name) or name
+
+
+def _member_target(target_folder: Path, member_name: str):
+    """
+    Returns where an archive member should be written inside target_folder,
+    dropping absolute prefixes and '..' components.
+    Returns None if nothing is left of the name.
+    """
+    parts = [part for part in member_name.replace('\\', '/').split('/')
+             if part not in ('', '.', '..')]
+    if not parts:
+        return None
+    return target_folder.joinpath(*parts)
+
+
+@contextlib.contextmanager
+def _open_7z(archive_path: Path):
+    """
+    Opens a .7z archive, or a split set starting at .7z.001, with py7zr.
+    """
+    if archive_path.name.lower().endswith('.7z.001'):
+        # multivolumefile joins data.7z.001, data.7z.002, ... into one stream
+        with multivolumefile.open(archive_path.with_suffix(''), mode='rb') as volumes, \
+                py7zr.SevenZipFile(volumes, 'r') as archive:
+            yield archive
+    else:
+        with py7zr.SevenZipFile(archive_path, 'r') as archive:
+            yield archive
+
+
+def _extract_with_py7zr(archive_path: Path, target_folder: Path):
+    """
+    Extracts a .7z archive (or split .7z.001 set) in-process with py7zr.
+    Corrupt data surfaces as all sorts of exceptions (py7zr's own, but also
+    lzma.LZMAError, EOFError, OSError), which are re-raised after removing
+    the files this call created. Files that were already there (e.g. from
+    another archive extracted into the same folder) are left alone.
+    """
+    with _open_7z(archive_path) as archive:
+        targets = [p for p in (_member_target(target_folder, name)
+                               for name in archive.getnames()) if p is not None]
+        existing = {p for p in targets if os.path.lexists(p)}
+        try:
+            archive.extractall(path=target_folder)
+        except Exception:
+            _discard_partial(p for p in targets
+                             if p not in existing and p.is_file() and not p.is_symlink())
+            raise
+
+
+def _discard_partial(paths):
+    """
+    Removes the files a failed in-process extraction already wrote, so
+    neither the fallback tool nor the output folder is left with
+    half-written files.
+    """
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _extract_with_libarchive(archive_path: Path, target_folder: Path):
+    """
+    Extracts an archive in-process with libarchive, streaming each entry to
+    disk in COPY_BUFSIZE blocks, with its permissions and mtime.
+    Links and special files are skipped.
+    Raises libarchive.ArchiveError if libarchive cannot read the archive, or
+    OSError; files written up to then are removed again.
+    """
+    fmt = _LIBARCHIVE_FORMATS[archive_path.suffix.lower()]
+    written = []
+    try:
+        with libarchive.file_reader(str(archive_path), format_name=fmt,
+                                    block_size=COPY_BUFSIZE) as archive:
+            for entry in archive:
+                target = _member_target(target_folder, entry.pathname)
+                if target is None:
+                    continue
+                if entry.isdir:
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                if not entry.isreg:
+                    continue
+                os.makedirs(target.parent, exist_ok=True)
+                written.append(target)
+                size = 0
+                with open(target, 'wb', buffering=0) as dst:
+                    for block in entry.get_blocks(COPY_BUFSIZE):
+                        size += dst.write(block)
+                # Corrupt data (bad CRC, wrong size) only gets a libarchive
+                # warning, so compare what came out with the header
+                if entry.size is not None and size != entry.size:
+                    raise libarchive.ArchiveError(
+                        f"{entry.pathname}: got {size} bytes, expected {entry.size}")
+                # Keep permissions and modification time, like unzip/unrar/7z
+                os.chmod(target, entry.perm & 0o777)
+                if entry.mtime is not None:
+                    os.utime(target, (entry.atime or entry.mtime, entry.mtime))
+    except (libarchive.ArchiveError, OSError):
+        _discard_partial(written)
+        raise
+
+
+@contextlib.asynccontextmanager
+async def _extract_slots(count: int = 1):
+    """
+    Holds count EXTRACT_SLOTS (at most all of them) for one extraction.
+    """
+    count = min(count, os.cpu_count() or 1)
+    if count == 1:
+        async with EXTRACT_SLOTS:
+            yield
+        return
+    held = 0
+    try:
+        async with _MULTI_SLOT_LOCK:
+            while held < count:
+                await EXTRACT_SLOTS.acquire()
+                held += 1
+        yield
+    finally:
+        for _ in range(held):
+            EXTRACT_SLOTS.release()
+
+
+async def extract_archive(archive_path: Path, target_folder: Path):
+    """
+    Extracts an archive to tmp_dir, in-process with py7zr (7z) or
+    libarchive when they are installed, otherwise (or if they fail, e.g. on
+    multi-volume sets or corrupt data) using external commands.
+    Adjust as needed for different archive types.
+    Returns True if the extraction succeeded.
+    The caller is responsible for creating target_folder.
+    """
     filename = archive_path.name.lower()
 
+    print(f"[INFO] Extracting {archive_path} =>  {target_folder}")
+
+    if py7zr is not None and filename.endswith(('.7z', '.7z.001')):
+        try:
+            async with EXTRACT_SLOTS:
+                await asyncio.to_thread(_extract_with_py7zr, archive_path, target_folder)
+            return True
+        except Exception as e:
+            print(f"[WARNING] py7zr could not extract {archive_path}, "
+                  f"falling back to 7z: {e}")
+    elif libarchive is not None and archive_path.suffix.lower() in _LIBARCHIVE_FORMATS:
+        try:
+            async with EXTRACT_SLOTS:
+                await asyncio.to_thread(_extract_with_libarchive, archive_path, target_folder)
+            return True
+        except (libarchive.ArchiveError, OSError) as e:
+            print(f"[WARNING] libarchive could not extract {archive_path}, "
+                  f"falling back to external tools: {e}")
+
     # Use 7z for most things, but we’ll try specialized tools for .rar and .zip
+    # Only 7z and unrar get a thread hint, and only they hold extra slots for it
+    threads = 1
     if filename.endswith('.zip'):
-        cmd = ['unzip', '-o', str(archive_path), '-d', str(target_folder)]
+        cmd = [_tool('unzip'), '-o', str(archive_path), '-d', str(target_folder)]
     elif filename.endswith('.rar'):
-        cmd = ['unrar', 'x', '-o+', str(archive_path), str(target_folder)]
+        cmd = [_tool('unrar'), 'x', '-o+', str(archive_path), str(target_folder)]
+        if THREADS_PER_ARCHIVE > 1:
+            threads = THREADS_PER_ARCHIVE
+            cmd[2:2] = [f'-mt{threads}']
     else:
         # Fallback: 7z can handle .7z, .7z.001, .gz, .tar, etc.
         # It's also possible to handle .zip and .rar with 7z if you prefer.
-        cmd = ['7z', 'x', '-y', f'-o{target_folder}', str(archive_path)]
+        cmd = [_tool('7z'), 'x', '-y', f'-o{target_folder}', str(archive_path)]
+        if THREADS_PER_ARCHIVE > 1:
+            threads = THREADS_PER_ARCHIVE
+            cmd[3:3] = [f'-mmt={threads}']
+
+    async with _extract_slots(threads):
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.DEVNULL, close_fds=False)
+        except OSError as e:
+            print(f"[ERROR] Extraction failed for {archive_path}: {e}")
+            return False
+        returncode = await proc.wait()
+    if returncode != 0:
+        e = subprocess.CalledProcessError(returncode, cmd)
+        print(f"[ERROR] Extraction failed for {archive_path}: {e}")
+        return False
+    return True
+
+
+def list_archive(archive_path: Path):
+    """
+    Lists the entry names of an archive without extracting it.
+    Directory entries end with '/'.
+    Returns None if the archive could not be listed.
+    """
+    filename = archive_path.name.lower()
 
-    print(f"[INFO] Extracting {archive_path} =>  {target_folder}")
     try:
-        # subprocess.run(cmd, check=True)
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"[ERROR] Extraction failed for {archive_path}: {e}")
+        if filename.endswith('.zip'):
+            with zipfile.ZipFile(archive_path) as archive:
+                return archive.namelist()
+        if filename.endswith('.rar'):
+            cmd = [_tool('unrar'), 'lb', str(archive_path)]
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                                 close_fds=False).stdout
+            return out.splitlines()
+        if py7zr is not None and filename.endswith(('.7z', '.7z.001')):
+            with _open_7z(archive_path) as archive:
+                return [info.filename + ('/' if info.is_directory else '')
+                        for info in archive.list()]
+
+        # 7z technical listing: one "Path = ..." block per entry
+        cmd = [_tool('7z'), 'l', '-ba', '-slt', str(archive_path)]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True,
+                             close_fds=False).stdout
+    except (OSError, subprocess.CalledProcessError, zipfile.BadZipFile) + _PY7ZR_ERRORS as e:
+        print(f"[WARNING] Could not list {archive_path}: {e}")
+        return None
+
+    names = []
+    for line in out.splitlines():
+        if line.startswith('Path = '):
+            names.append(line[len('Path = '):])
+        elif line == 'Folder = +' and names:
+            names[-1] += '/'
+    return names
+
+
+def can_extract_directly(names) -> bool:
+    """
+    Return True if an archive with these entries can be extracted straight
+    into its destination folder: no nested core archives, no split parts
+    and no sub-folders (files are moved into the destination flat anyway).
+    """
+    for name in names:
+        if '/' in name or '\\' in name:
+            return False
+        if _classify_name(name):
+            return False
+    return True
+
 
+def _iter_files(root):
+    """
+    Yields every entry below root that os.walk lists as a file (regular
+    files, and symlinks unless they point to a folder) as an os.DirEntry
+    (use .path and .name, both plain strings).
+    Uses os.scandir, so file/dir checks come from the directory listing
+    instead of an extra stat() per entry.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            elif not entry.is_dir():
+                yield entry
+
+
+def collect_core_archives(folder: Path):
+    """
+    Returns the "core" archives directly inside folder, sorted by name.
+    One os.scandir pass: names are matched first, and the file check comes
+    from the directory listing, so other entries cost no stat() at all.
+    """
+    with os.scandir(folder) as entries:
+        return sorted(Path(entry.path) for entry in entries
+                      if is_core_name(entry.name) and entry.is_file())
 
-def move_non_archives(src_dir: Path, dest_dir: Path):
+
+def _copy_file(src, dst):
+    """
+    Copies src to dst across filesystems, in the kernel via copy_file_range
+    where possible, otherwise through a large userspace buffer.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        if hasattr(os, 'copy_file_range'):
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                return
+            except OSError:
+                # Not supported for this pair of filesystems: start over
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, COPY_BUFSIZE)
+
+
+def _move_file(src, dst, same_device: bool):
+    """
+    Moves src to dst, overwriting dst.
+    On the same filesystem this is a single rename, otherwise the data is
+    copied (keeping permissions and timestamps) and src is removed.
+    A symlink is moved as a link, like shutil.move does.
+    """
+    if same_device:
+        os.replace(src, dst)
+        return
+    if os.path.islink(src):
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        os.symlink(os.readlink(src), dst)
+        os.unlink(src)
+        return
+    _copy_file(src, dst)
+    shutil.copystat(src, dst)
+    os.unlink(src)
+
+
+def move_non_archives(src_dir: Path, dest_dir: Path, verbose: bool = False):
     """
     Moves non-archive files from src_dir to dest_dir (recursively).
     Also, skip any known multi-part splits (like .r01, .z01, .7z.002, etc.).
     This ensures we do NOT copy those "split" files into output.
+    Per-file messages are only printed when verbose is set.
     """
-    # Pattern for multi-part splits we do NOT want to copy:
-    skip_patterns = [
-        r'\.r\d+$',  # .r00, .r01, .r02, ...
-        r'\.\d{3}$',  # .001, .002, .003, ...
-        r'\.z\d{2}$',  # .z01, .z02, .z03, ...
-        r'\.7z\.\d{3}$'  # .7z.001, .7z.002, .7z.003, ...
-    ]
-    skip_regex = re.compile('|'.join(skip_patterns), re.IGNORECASE)
-
-    for root, dirs, files in os.walk(src_dir):
-        for file in files:
-            file_path = Path(root) / file
-            rel_path = file_path.relative_to(src_dir)
-            # target_path = dest_dir  / rel_path
-            target_path = dest_dir
-
-            # If it’s a known split part, skip it.
-            if skip_regex.search(file.lower()):
-                #print(f"[INFO] Skipping multi-part segment: {file_path}")
-                continue
-
-            # If it's an archive but not a "core" archive, skip it as well.
-            if is_core_archive(file_path):
-                # We only want to move non-archives here, so skip .rar/.zip/.7z
+    # Files land flat in dest_dir, so it is the only folder to create
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    # A rename is a metadata update, anything else has to copy the data
+    same_device = os.stat(src_dir).st_dev == os.stat(dest_dir).st_dev
+
+    # Plain strings from here on: this loop runs once per extracted file
+    dest_dir = os.fspath(dest_dir)
+
+    for entry in _iter_files(src_dir):
+        name = entry.name
+        file_path = entry.path
+        # Files are flattened: target is dest_dir/name, not dest_dir/rel_path
+
+        flags = _classify_name(name)
+
+        # If it’s a known split part, skip it.
+        if flags & _SPLIT:
+            #print(f"[INFO] Skipping multi-part segment: {file_path}")
+            continue
+
+        # If it's an archive but not a "core" archive, skip it as well.
+        if flags & _CORE:
+            # We only want to move non-archives here, so skip .rar/.zip/.7z
+            if verbose:
                 print(f"[INFO] Skipping core archive: {file_path}")
-                continue
+            continue
 
-            # Otherwise, move the file
-            print(f"[INFO] Moving file: {file_path} =>  {target_path}")
-            target_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.move(str(file_path), str(target_path))
+        # Otherwise, move the file
+        if verbose:
+            print(f"[INFO] Moving file: {file_path} =>  {dest_dir}")
+        _move_file(file_path, os.path.join(dest_dir, name), same_device)
 
 
-def recursively_extract(tmp_dir: Path, dest_folder: Path):
+def _merge_tree(src: Path, dst: Path):
     """
-    Recursively finds "core" archives in tmp_dir and extracts them in-place
-    until there are no more core archives to extract.
+    Moves everything below src into dst, keeping the folder structure and
+    overwriting files that are already there, then removes src.
+    Both must be on the same filesystem: every file is a single rename.
     """
-    something_extracted = True
-    while something_extracted:
-        something_extracted = False
-        archives = []
+    dst.mkdir(parents=True, exist_ok=True)
+    with os.scandir(src) as entries:
+        for entry in entries:
+            target = dst / entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False) and not target.is_symlink():
+                    _merge_tree(Path(entry.path), target)
+                else:
+                    os.replace(entry.path, target)
+            except OSError as e:
+                print(f"[WARNING] Could not move {entry.path} =>  {target}: {e}")
+    shutil.rmtree(src, ignore_errors=True)
 
-        # Gather all "core" archives in the tmp_dir
-        for root, dirs, files in os.walk(tmp_dir):
-            for f in files:
-                p = Path(root) / f
-                if is_core_archive(p):
-                    archives.append(p)
 
-        if not archives:
-            break
+async def recursively_extract(tmp_dir: Path, dest_folder: Path):
+    """
+    Finds the "core" archives in tmp_dir and extracts them directly into
+    dest_folder. Nothing they contain lands back in tmp_dir, so a single scan
+    of tmp_dir finds every archive there is to extract.
+    """
+    # Gather all "core" archives in the tmp_dir
+    archives = [Path(entry.path) for entry in _iter_files(tmp_dir)
+                if is_core_name(entry.name)]
+
+    if len(archives) > 1:
+        # Extract them concurrently (EXTRACT_SLOTS limits how many at once),
+        # each into a private folder inside dest_folder, then merge those in
+        # order: same result as one after another, the last archive wins
+        # where member names clash. Merging is renames only, same filesystem.
+        folders = [dest_folder / f'.{uuid.uuid4().hex}.nested' for _ in archives]
+        for folder in folders:
+            folder.mkdir()
+        results = await asyncio.gather(*[extract_archive(archive, folder)
+                                         for archive, folder in zip(archives, folders)])
+        for folder in folders:
+            await asyncio.to_thread(_merge_tree, folder, dest_folder)
+    else:
+        results = [await extract_archive(archive, dest_folder) for archive in archives]
+
+    for archive, ok in zip(archives, results):
+        if not ok:
+            # Leave it in place
+            continue
+        # After extraction, remove the original archive file
+        try:
+            archive.unlink()
+        except Exception as e:
+            print(f"[WARNING] Could not delete archive {archive}: {e}")
+
 
-        for archive in archives:
-            #extract_archive(archive, archive.parent)  # extract in place
-            extract_archive(archive, dest_folder)  # extract directly to output
-            # After extraction, remove the original archive file
+def filesystem_type(path: Path):
+    """
+    Returns the type of the filesystem holding path (e.g. 'tmpfs', 'ext4'),
+    or None if it cannot be determined (non-Linux systems).
+    """
+    path = os.path.realpath(path)
+    best_mount, best_type = '', None
+    try:
+        with open('/proc/self/mounts') as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces in mount points are escaped as \040
+                mount_point = fields[1].replace('\\040', ' ')
+                if mount_point == '/' or path == mount_point or path.startswith(mount_point + '/'):
+                    if len(mount_point) >= len(best_mount):
+                        best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return None
+    return best_type
+
+
+def unmount_tmpfs(mount_point: Path):
+    """
+    Unmounts a tmpfs mounted by prepare_tmp_dir.
+    """
+    try:
+        subprocess.run(['umount', str(mount_point)], check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[WARNING] Could not unmount tmpfs at {mount_point}: {e}")
+
+
+def prepare_tmp_dir(tmp_dir: Path, output_folder: Path, ramdisk_size: int, needed_bytes: int):
+    """
+    Creates tmp_dir and reports whether staging there is cheap.
+    With ramdisk_size (MiB) set, mounts a private tmpfs on tmp_dir first,
+    so nested unpacking happens in RAM. The mount is undone at exit.
+    needed_bytes is the compressed size of the archives that may be staged
+    at once, a lower bound for the space their contents take.
+    Warns when tmp_dir does not even have that much space, or when it
+    is a disk on another filesystem than output_folder (every staged byte
+    gets written twice).
+    """
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    fs_type = filesystem_type(tmp_dir)
+    if ramdisk_size and fs_type != 'tmpfs':
+        if sys.platform.startswith('linux'):
+            cmd = ['mount', '-t', 'tmpfs', '-o', f'size={ramdisk_size}M', 'tmpfs', str(tmp_dir)]
             try:
-                archive.unlink()
-            except Exception as e:
-                print(f"[WARNING] Could not delete archive {archive}: {e}")
-            something_extracted = True
+                subprocess.run(cmd, check=True)
+                atexit.register(unmount_tmpfs, tmp_dir)
+                fs_type = 'tmpfs'
+                print(f"[INFO] Mounted a {ramdisk_size} MiB tmpfs on {tmp_dir}")
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"[WARNING] Could not mount tmpfs on {tmp_dir}: {e}")
+        else:
+            print("[WARNING] --ramdisk-size is only supported on Linux, ignoring it.")
+
+    st = os.statvfs(tmp_dir)
+    free_bytes = st.f_bavail * st.f_frsize
+    print(f"[INFO] tmp_dir {tmp_dir} is on {fs_type or 'unknown fs'}, "
+          f"{free_bytes // (1 << 20)} MiB free")
+    if free_bytes < needed_bytes:
+        print(f"[WARNING] tmp_dir has less free space than the archives staged at once "
+              f"take even compressed ({needed_bytes // (1 << 20)} MiB), "
+              f"nested extraction will likely fail.")
+
+    if fs_type != 'tmpfs' and os.stat(tmp_dir).st_dev != os.stat(output_folder).st_dev:
+        print(f"[WARNING] tmp_dir is a disk on another filesystem than {output_folder}: "
+              f"staged files are written twice. Consider --ramdisk-size or a tmp_dir "
+              f"on the output filesystem.")
+
+
+# Background deletions started by discard_dir, awaited before main returns
+_CLEANUP_TASKS = set()
+
+
+def discard_dir(path: Path):
+    """
+    Gets a folder out of the way immediately and deletes it in the background.
+    The folder is renamed to a '.pending' sibling (a single rename, however
+    many files it holds) and removed by a worker thread, so extraction into
+    a fresh folder of the same name can start right away.
+    """
+    pending = path.with_name(f'{path.name}.{uuid.uuid4().hex}.pending')
+    try:
+        os.rename(path, pending)
+    except FileNotFoundError:
+        return
+    task = asyncio.create_task(asyncio.to_thread(shutil.rmtree, pending, ignore_errors=True))
+    _CLEANUP_TASKS.add(task)
+    task.add_done_callback(_CLEANUP_TASKS.discard)
+
+
+async def process_archive(archive_path: Path, dest_folder: Path, work_dir: Path,
+                          verbose: bool = False):
+    """
+    Extracts one top-level archive, and any core archives inside it, into
+    dest_folder. work_dir is this archive's private staging folder.
+    """
+    print(f"[INFO] Processing {archive_path.name} ...")
 
+    # Create the output dir up front, both extraction paths need it
+    dest_folder.mkdir(parents=True, exist_ok=True)
 
-def main():
+    # Without nested archives there is nothing to stage: extract straight
+    # to the destination and skip the tmp_dir copy
+    names = await asyncio.to_thread(list_archive, archive_path)
+    if names is not None and can_extract_directly(names):
+        await extract_archive(archive_path, dest_folder)
+        return
+
+    # 1. Clean work_dir (leftovers of an interrupted run)
+    discard_dir(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    # 2. Extract the top-level archive to work_dir
+    await extract_archive(archive_path, work_dir)
+
+    # 3. Recursively extract any nested core archives in work_dir
+    await recursively_extract(work_dir, dest_folder)
+
+    # 4. Move non-archive (non-split) files into the destination folder
+    await asyncio.to_thread(move_non_archives, work_dir, dest_folder, verbose)
+
+    # 5. Clean up work_dir, without waiting for the deletion to finish
+    discard_dir(work_dir)
+
+
+async def process_queue(queue, verbose: bool = False) -> int:
+    """
+    Worker: takes (archive_path, dest_folder, work_dir) jobs off the queue and
+    processes them one at a time, so each worker stages at most one archive
+    in tmp_dir. A failing archive is reported and does not stop the others.
+    Returns the number of archives processed.
+    """
+    processed = 0
+    while queue:
+        archive_path, dest_folder, work_dir = queue.popleft()
+        try:
+            await process_archive(archive_path, dest_folder, work_dir, verbose)
+            processed += 1
+        except Exception as e:
+            print(f"[ERROR] Processing {archive_path.name} failed: {e}")
+    return processed
+
+
+async def main():
+    global THREADS_PER_ARCHIVE
     args = parse_args()
 
+    THREADS_PER_ARCHIVE = max(1, args.threads_per_archive)
+    slots = os.cpu_count() or 1
+
     input_folder = Path(args.folder)
     output_folder = Path(args.output)
     tmp_dir = Path(args.tmp_dir)
@@ -172,15 +751,13 @@ def main():
     output_folder.mkdir(parents=True, exist_ok=True)
 
     # Collect the "core" archives from the input folder
-    all_core_archives = []
-    for file_path in input_folder.iterdir():
-        if file_path.is_file() and is_core_archive(file_path):
-            all_core_archives.append(file_path)
-
-    processed_count = 0
+    all_core_archives = collect_core_archives(input_folder)
 
+    # Pick the archives to process before starting, so they can run concurrently
+    pending = collections.deque()
+    claimed = set()
     for archive_path in all_core_archives:
-        if max_files and processed_count >= max_files:
+        if max_files and len(pending) >= max_files:
             print(f"[INFO] Reached the limit of {max_files} files to process.")
             break
 
@@ -190,38 +767,37 @@ def main():
         core_name = archive_path.stem
         dest_folder = output_folder / core_name
 
-        if dest_folder.exists():
+        # Archives with the same stem (a.zip and a.7z) share dest_folder and
+        # staging folder, so only the first one is processed, as when they
+        # ran one after another
+        if dest_folder.exists() or core_name in claimed:
             print(f"[INFO] Skipping {archive_path.name}, already processed (folder exists).")
             continue
+        claimed.add(core_name)
 
-        print(f"[INFO] Processing {archive_path.name} ...")
-
-        # 1. Clean tmp_dir
-        if tmp_dir.exists():
-            shutil.rmtree(tmp_dir)
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-        #Also create oputut_dir
-        dest_folder.mkdir(parents=True, exist_ok=True)
-
-
-        # 2. Extract the top-level archive to tmp_dir
-        extract_archive(archive_path, tmp_dir)
-
+        # Each archive gets its own staging folder inside tmp_dir
+        pending.append((archive_path, dest_folder, tmp_dir / core_name))
 
-        # 3. Recursively extract any nested core archives in tmp_dir
-        recursively_extract(tmp_dir, dest_folder)
+    # One archive per extraction slot is in flight, staged in tmp_dir.
+    # Only the archives that will actually be processed are looked at.
+    sizes = sorted((job[0].stat().st_size for job in pending), reverse=True)
+    prepare_tmp_dir(tmp_dir, output_folder, args.ramdisk_size, sum(sizes[:slots]))
 
-        # 4. Move non-archive (non-split) files into the destination folder
-        #dest_folder.mkdir(parents=True, exist_ok=True)
-        move_non_archives(tmp_dir, dest_folder)
+    # Folders an interrupted run did not finish deleting
+    for leftover in tmp_dir.glob('*.pending'):
+        discard_dir(leftover)
 
-        # 5. Clean up tmp_dir
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+    # A fixed number of workers, so tmp_dir never holds more than `slots`
+    # staged archives at once
+    workers = [process_queue(pending, args.verbose) for _ in range(min(slots, len(pending)))]
+    processed = sum(await asyncio.gather(*workers))
 
-        processed_count += 1
+    # Let the background deletions finish before tmp_dir may be unmounted
+    while _CLEANUP_TASKS:
+        await asyncio.gather(*_CLEANUP_TASKS)
 
-    print(f"[INFO] Done. Processed {processed_count} archives.")
+    print(f"[INFO] Done. Processed {processed} archives.")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())